@@ -9,16 +9,21 @@ the Python Cookbook, published by O'Reilly.
 Library usage: see the Timer class.
 
 Command line usage:
-    python timeit.py [-n N] [-r N] [-s S] [-t] [-c] [-p] [-h] [--] [statement]
+    python timeit.py [-n N] [-r N] [-s S] [-t] [-c] [-p] [-P N] [--auto-timer]
+                     [-h] [--] [statement]
 
 Options:
   -n/--number N: how many times to execute 'statement' (default: see below)
   -r/--repeat N: how many times to repeat the timer (default 3)
   -s/--setup S: statement to be executed once initially (default 'pass').
                 Execution time of this setup statement is NOT timed.
-  -p/--process: use time.process_time() (default is time.perf_counter())
-  -t/--time: use time.time() (deprecated)
-  -c/--clock: use time.clock() (deprecated)
+  -p/--process: use time.process_time() (default is time.perf_counter_ns()
+                where available, else time.perf_counter())
+  -t/--time: use time.time() (deprecated; float timer)
+  -c/--clock: use time.clock() (deprecated; float timer)
+  -P/--pin N: pin the process to CPU N while timing (Linux only)
+  --auto-timer: use the monotonic timer that is cheapest to read, among
+                those with a resolution of 1 usec or better
   -v/--verbose: print raw timing results; repeat for more digits precision
   -u/--unit: set the output time unit (usec, msec, or sec)
   -h/--help: print this usage message and exit
@@ -31,7 +36,8 @@ argument in quotes and using leading spaces.  Multiple -s options are
 treated similarly.
 
 If -n is not given, a suitable number of loops is calculated by trying
-successive powers of 10 until the total time is at least 0.2 seconds.
+successive values from the sequence 1, 2, 5, 10, 20, 50, ... until the
+total time is at least 0.2 seconds.
 
 Note: there is a certain baseline overhead associated with executing a
 pass statement.  It differs between versions.  The code here doesn't try
@@ -46,40 +52,333 @@ Functions:
 
     timeit(string, string) -> float
     repeat(string, string) -> list
-    default_timer() -> float
+    default_timer() -> int or float
 
 """
 
 import gc
 import sys
 import time
-import itertools
+import functools
 
 __all__ = ["Timer", "timeit", "repeat", "default_timer"]
 
 dummy_src_name = "<timeit-src>"
 default_number = 1000000
 default_repeat = 3
-default_timer = time.perf_counter
+# perf_counter_ns() keeps the counter as an integer number of nanoseconds;
+# Timer.timeit() converts to seconds once, after the timed loop.
+default_timer = getattr(time, "perf_counter_ns", time.perf_counter)
+
+# The timers known to count nanoseconds, among those that exist
+_ns_timers = frozenset(getattr(time, name) for name in
+                       ("perf_counter_ns", "monotonic_ns", "process_time_ns",
+                        "thread_time_ns", "time_ns", "clock_gettime_ns")
+                       if hasattr(time, name))
+
+def _is_ns_timer(timer):
+    """Helper to tell whether timer counts nanoseconds rather than seconds.
+
+    This goes by the timer's identity, so any other timer, including
+    one that returns integers, is taken to count seconds.
+    """
+    if isinstance(timer, functools.partial):
+        # Such as the clock_gettime_ns() timer picked by --auto-timer
+        timer = timer.func
+    return timer in _ns_timers
 
 _globals = globals
 
 # Don't change the indentation of the template; the reindent() calls
-# in Timer.__init__() depend on setup being indented 4 spaces and stmt
-# being indented 8 spaces.
+# in _compile_template() depend on setup being indented 4 spaces and stmt
+# being indented 8 spaces.  The timer and range() arrive as locals, so
+# the loop itself does no global or builtin lookups.  inner() returns the
+# raw timer readings; Timer._timeit_inner() turns them into seconds.
+# The loop body holds 'unroll' copies of stmt, followed by a loop for
+# the remaining _it % unroll executions.  Both ranges are built before
+# the first timer read, so nothing is allocated for them while timing.
 template = """
-def inner(_it, _timer{init}):
+def inner(_it, _timer, _range=range{init}):
     {setup}
+    _n = _range(_it // {unroll})
+    _r = _range(_it % {unroll})
     _t0 = _timer()
-    for _i in _it:
+    for _i in _n:
+        {unrolled}
+    for _i in _r:
         {stmt}
     _t1 = _timer()
-    return _t1 - _t0
+    return _t0, _t1
 """
+unroll = 8
 
+# Template used when a compiled engine supplies the loop: _loop(_stmt, n)
+# calls the callable statement n times without going through the
+# interpreter's loop.
+native_template = """
+def inner(_it, _timer{init}):
+    {setup}
+    _t0 = _timer()
+    _loop(_stmt, _it)
+    _t1 = _timer()
+    return _t0, _t1
+"""
+
+_auto_timer = None
+_engines = (None, "numba", "cext")
+_numba_loop = None
+_cext_loop = None
+
+# Source of the extension module used for engine="cext"
+cext_source = r"""
+#include <Python.h>
+
+static PyObject *
+loop(PyObject *self, PyObject *args)
+{
+    PyObject *stmt, *result;
+    Py_ssize_t i, n;
+
+    if (!PyArg_ParseTuple(args, "On:loop", &stmt, &n))
+        return NULL;
+    for (i = 0; i < n; i++) {
+        result = PyObject_CallObject(stmt, NULL);
+        if (result == NULL)
+            return NULL;
+        Py_DECREF(result);
+    }
+    Py_RETURN_NONE;
+}
+
+static PyMethodDef methods[] = {
+    {"loop", loop, METH_VARARGS, "loop(stmt, n): call stmt() n times."},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT, "_timeit_cext", NULL, -1, methods
+};
+
+PyMODINIT_FUNC
+PyInit__timeit_cext(void)
+{
+    return PyModule_Create(&module);
+}
+"""
+
+# Line breaks for the two indents used by the template
+_newlines = {4: "\n" + " "*4, 8: "\n" + " "*8}
+
+@functools.lru_cache(maxsize=32)
 def reindent(src, indent):
     """Helper to reindent a multi-line statement."""
-    return src.replace("\n", "\n" + " "*indent)
+    newline = _newlines.get(indent)
+    if newline is None:
+        newline = "\n" + " "*indent
+    return src.replace("\n", newline)
+
+def _get_numba_loop(stmt):
+    """Helper to get a numba-compiled loop calling stmt.
+
+    Returns None unless numba is installed and stmt is a function
+    compiled with numba.njit, in which case the loop can call it
+    without leaving native code.
+    """
+    global _numba_loop
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    try:
+        # numba 0.49 and later
+        from numba.core.dispatcher import Dispatcher
+    except ImportError:
+        # Older releases, the only ones that run on Python 3.5
+        from numba.dispatcher import Dispatcher
+    if not isinstance(stmt, Dispatcher):
+        return None
+    if _numba_loop is None:
+        # Not cache=True: the cache entry is keyed on the type of the
+        # stmt dispatcher, which differs in every session, so it never
+        # hits; and it would be written next to this module.
+        @njit
+        def loop(stmt, n):
+            for i in range(n):
+                stmt()
+        _numba_loop = loop
+    return _numba_loop
+
+def _build_cext():
+    """Helper to build and import the extension module in cext_source.
+
+    The shared library is cached as ~/.cache/timeit_cext/<hash>.so,
+    keyed by the source and the Python version, so it is only compiled
+    the first time.
+    """
+    import hashlib, importlib.util, os, tempfile
+    key = "%s\n%s\n%s" % (sys.version, sys.platform, cext_source)
+    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "timeit_cext")
+    path = os.path.join(cache_dir,
+                        hashlib.sha1(key.encode()).hexdigest() + ".so")
+    if not os.path.exists(path):
+        from distutils.ccompiler import new_compiler
+        from distutils.sysconfig import customize_compiler, get_python_inc
+        os.makedirs(cache_dir, exist_ok=True)
+        # Build next to the cache, so the final rename is atomic
+        with tempfile.TemporaryDirectory(dir=cache_dir) as tmp:
+            c_path = os.path.join(tmp, "_timeit_cext.c")
+            with open(c_path, "w") as f:
+                f.write(cext_source)
+            compiler = new_compiler()
+            customize_compiler(compiler)
+            objects = compiler.compile([c_path], output_dir=tmp,
+                                       include_dirs=[get_python_inc()])
+            so_path = os.path.join(tmp, "_timeit_cext.so")
+            compiler.link_shared_object(objects, so_path)
+            os.replace(so_path, path)
+    spec = importlib.util.spec_from_file_location("_timeit_cext", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _get_cext_loop():
+    """Helper to get the C loop for engine="cext".
+
+    Returns None if the extension cannot be built, for instance when
+    there is no C compiler.  The failure is reported with a
+    RuntimeWarning and remembered, so the build is only tried, and the
+    warning only issued, once.
+    """
+    global _cext_loop
+    if _cext_loop is None:
+        try:
+            _cext_loop = _build_cext().loop
+        except Exception as err:
+            _cext_loop = False
+            import warnings
+            # stacklevel=3 points at the caller of Timer()
+            warnings.warn("cannot build the C loop for engine='cext', "
+                          "using the Python loop instead: %r" % (err,),
+                          RuntimeWarning, stacklevel=3)
+    return _cext_loop or None
+
+def _compile_template(setup, stmt, init, native=False):
+    """Helper to build and compile the template for a pair of statements.
+
+    'setup' and 'stmt' are source strings, or None when the statement
+    is a callable passed to inner() through 'init'.  If 'native' is
+    true, stmt must be None and native_template is used instead of
+    template.  Returns a tuple of the template source and its code
+    object.  The result is cached, so timing the same snippet again
+    skips the syntax checks and the compile; the current values of
+    the module's template and unroll are part of the cache key.
+    """
+    return _compile_source(setup, stmt, init,
+                           native_template if native else template, unroll)
+
+@functools.lru_cache(maxsize=128)
+def _compile_source(setup, stmt, init, src_template, unroll):
+    """Helper doing the work of _compile_template(), with its cache."""
+    if setup is None:
+        stmtprefix = ''
+        setup = '_setup()'
+    else:
+        # Check that the code can be compiled outside a function
+        compile(setup, dummy_src_name, "exec")
+        stmtprefix = setup + '\n'
+        setup = reindent(setup, 4)
+    if stmt is None:
+        stmt = '_stmt()'
+    else:
+        # Check that the code can be compiled outside a function
+        compile(stmtprefix + stmt, dummy_src_name, "exec")
+        stmt = reindent(stmt, 8)
+    unrolled = _newlines[8].join([stmt] * unroll)
+    src = src_template.format(stmt=stmt, unrolled=unrolled, unroll=unroll,
+                              setup=setup, init=init)
+    return src, compile(src, dummy_src_name, "exec")
+
+def _timer_candidates():
+    """Helper to list the monotonic timers, as (timer, resolution) pairs.
+
+    The integer nanosecond variant of each clock is used if available.
+    """
+    for name in ("perf_counter", "monotonic"):
+        timer = getattr(time, name + "_ns", None) or getattr(time, name)
+        yield timer, time.get_clock_info(name).resolution
+    clock = getattr(time, "CLOCK_MONOTONIC_RAW", None)
+    if clock is not None:
+        gettime = getattr(time, "clock_gettime_ns", time.clock_gettime)
+        yield functools.partial(gettime, clock), time.clock_getres(clock)
+
+def _get_auto_timer(calls=10000):
+    """Helper to pick the monotonic timer that is cheapest to read.
+
+    Each candidate with a resolution of 1 usec or better is called
+    'calls' times, timed with default_timer, and the cheapest one wins.
+    The choice is made once and cached.
+    """
+    global _auto_timer
+    if _auto_timer is None:
+        best = None
+        for timer, resolution in _timer_candidates():
+            if resolution > 1e-6:
+                continue
+            t0 = default_timer()
+            for i in range(calls):
+                timer()
+            cost = default_timer() - t0
+            if best is None or cost < best[0]:
+                best = cost, timer
+        _auto_timer = default_timer if best is None else best[1]
+    return _auto_timer
+
+def _isolate(pin_cpu, high_priority):
+    """Helper to shield the timed code from the scheduler.
+
+    If 'pin_cpu' is not None, the process is pinned to that CPU; if
+    'high_priority' is true, its niceness is set to -20, which usually
+    needs privileges.  Both need os.sched_setaffinity() and friends, so
+    Linux.  Returns the state to pass to _restore() afterwards.
+    """
+    if pin_cpu is None and not high_priority:
+        return None
+    import os
+    affinity = priority = None
+    if pin_cpu is not None:
+        affinity = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, {pin_cpu})
+    if high_priority:
+        try:
+            priority = os.getpriority(os.PRIO_PROCESS, 0)
+            os.setpriority(os.PRIO_PROCESS, 0, -20)
+        except:
+            _restore((affinity, None))
+            raise
+    return affinity, priority
+
+def _restore(state):
+    """Helper to undo what _isolate() did."""
+    if state is None:
+        return
+    import os
+    affinity, priority = state
+    if priority is not None:
+        os.setpriority(os.PRIO_PROCESS, 0, priority)
+    if affinity is not None:
+        os.sched_setaffinity(0, affinity)
+
+# inner() for the 'pass'/'pass' baseline, which is what the module times
+# by default.  It is built once here, so that Timers for it skip the
+# formatting, compile and exec in Timer.__init__() entirely.
+# Timer.__init__() only uses it while template and unroll are the ones
+# it was built from.
+_pass_template, _pass_unroll = template, unroll
+_pass_src, _pass_code = _compile_template("pass", "pass", "")
+_pass_ns = {}
+exec(_pass_code, globals(), _pass_ns)
+_pass_inner = _pass_ns["inner"]
+del _pass_code, _pass_ns
 
 class Timer:
     """Class for timing execution speed of small code snippets.
@@ -91,46 +390,78 @@ class Timer:
     executed within that namespace (as opposed to inside timeit's
     namespace).
 
+    If 'engine' is "numba" and the statement is a function compiled
+    with numba.njit, the loop calling it is compiled with numba as
+    well, so that the statement is timed without the interpreter's
+    loop overhead.  Otherwise, including when numba is not installed,
+    the engine is ignored.
+
+    If 'engine' is "cext", the statement must be a callable; it is
+    called from a loop in a small C extension, which is compiled once
+    and cached under ~/.cache.  This is not necessarily faster: the loop
+    still makes a full Python call per execution, and on recent CPython
+    versions the template's unrolled loop is as fast or faster.  If the
+    extension cannot be built, a RuntimeWarning is issued and the
+    template's loop is used.
+
     To measure the execution time of the first statement, use the
     timeit() method.  The repeat() method is a convenience to call
     timeit() multiple times and return a list of results.
 
     The statements may contain newlines, as long as they don't contain
-    multi-line string literals.
+    multi-line string literals.  The main statement is repeated several
+    times in the body of the timing loop, so it should not use 'break'
+    or 'continue'.
     """
 
     def __init__(self, stmt="pass", setup="pass", timer=default_timer,
-                 globals=None):
+                 globals=None, engine=None):
         """Constructor.  See class doc string."""
+        if engine not in _engines:
+            raise ValueError("unknown engine %r" % (engine,))
+        if engine == "cext" and isinstance(stmt, str):
+            raise ValueError("engine 'cext' needs a callable stmt")
         self.timer = timer
+        self._ns_timer = _is_ns_timer(timer)
+        if (stmt == "pass" and setup == "pass" and
+            template is _pass_template and unroll == _pass_unroll):
+            # The baseline does not depend on globals or the engine
+            self.src = _pass_src
+            self.inner = _pass_inner
+            return
         local_ns = {}
         global_ns = _globals() if globals is None else globals
         init = ''
+        native = False
         if isinstance(setup, str):
-            # Check that the code can be compiled outside a function
-            compile(setup, dummy_src_name, "exec")
-            stmtprefix = setup + '\n'
-            setup = reindent(setup, 4)
+            # Compiled and syntax checked by _compile_template()
+            pass
         elif callable(setup):
             local_ns['_setup'] = setup
             init += ', _setup=_setup'
-            stmtprefix = ''
-            setup = '_setup()'
+            setup = None
         else:
             raise ValueError("setup is neither a string nor callable")
         if isinstance(stmt, str):
-            # Check that the code can be compiled outside a function
-            compile(stmtprefix + stmt, dummy_src_name, "exec")
-            stmt = reindent(stmt, 8)
+            # Compiled and syntax checked by _compile_template()
+            pass
         elif callable(stmt):
             local_ns['_stmt'] = stmt
             init += ', _stmt=_stmt'
-            stmt = '_stmt()'
+            loop = None
+            if engine == "numba":
+                loop = _get_numba_loop(stmt)
+            elif engine == "cext":
+                loop = _get_cext_loop()
+            if loop is not None:
+                local_ns['_loop'] = loop
+                init += ', _loop=_loop'
+                native = True
+            stmt = None
         else:
             raise ValueError("stmt is neither a string nor callable")
-        src = template.format(stmt=stmt, setup=setup, init=init)
+        src, code = _compile_template(setup, stmt, init, native)
         self.src = src  # Save for traceback display
-        code = compile(src, dummy_src_name, "exec")
         exec(code, global_ns, local_ns)
         self.inner = local_ns["inner"]
 
@@ -161,7 +492,8 @@ class Timer:
 
         traceback.print_exc(file=file)
 
-    def timeit(self, number=default_number):
+    def timeit(self, number=default_number, collect=True, warmup=0,
+               pin_cpu=None, high_priority=False):
         """Time 'number' executions of the main statement.
 
         To be precise, this executes the setup statement once, and
@@ -170,25 +502,63 @@ class Timer:
         argument is the number of times through the loop, defaulting
         to one million.  The main statement, the setup statement and
         the timer function to be used are passed to the constructor.
+
+        If the timer is one of the time module's *_ns() functions, such
+        as time.perf_counter_ns(), its readings are converted from
+        nanoseconds; the result is always in seconds.
+
+        Garbage collection is disabled while timing.  Unless 'collect'
+        is false, a full collection is run first, so that garbage left
+        over from earlier code does not affect the measurement.  If the
+        collector is already disabled, as it is during repeat(), it is
+        left alone and no collection is run.
+
+        If 'warmup' is given, the main statement is first run that many
+        times in a separate, untimed run, which executes the setup
+        statement once more, and the result is discarded.  This lets
+        adaptive interpreters and JIT compilers settle before the timed
+        run; note that an expensive setup statement then costs twice.
+
+        On Linux, 'pin_cpu' pins the process to the given CPU and a true
+        'high_priority' raises its scheduling priority (this usually
+        needs privileges) for the duration of the call, so that other
+        processes interfere less with the timing.
         """
-        it = itertools.repeat(None, number)
+        state = _isolate(pin_cpu, high_priority)
         gcold = gc.isenabled()
         gc.disable()
         try:
-            timing = self.inner(it, self.timer)
+            self._warmup(warmup)
+            if collect and gcold:
+                gc.collect()
+            timing = self._timeit_inner(number)
         finally:
             if gcold:
                 gc.enable()
+            _restore(state)
         return timing
 
-    def repeat(self, repeat=default_repeat, number=default_number):
+    def _warmup(self, warmup):
+        """Do the untimed warmup run described in timeit(), if any."""
+        if warmup:
+            self.inner(warmup, self.timer)
+
+    def _timeit_inner(self, number):
+        """Run the timed loop once; the caller takes care of the GC."""
+        t0, t1 = self.inner(number, self.timer)
+        if self._ns_timer:
+            return (t1 - t0) / 1e9
+        return t1 - t0
+
+    def repeat(self, repeat=default_repeat, number=default_number,
+               collect=True, warmup=0, pin_cpu=None, high_priority=False):
         """Call timeit() a few times.
 
         This is a convenience function that calls the timeit()
         repeatedly, returning a list of results.  The first argument
         specifies how many times to call timeit(), defaulting to 3;
-        the second argument specifies the timer argument, defaulting
-        to one million.
+        the second argument specifies the number of loops passed to
+        each timeit() call, defaulting to one million.
 
         Note: it's tempting to calculate mean and standard deviation
         from the result vector and report these.  However, this is not
@@ -200,13 +570,53 @@ class Timer:
         of the result is probably the only number you should be
         interested in.  After that, you should look at the entire
         vector and apply common sense rather than statistics.
+
+        Garbage collection is disabled around all the timeit() calls,
+        so it stays off between them rather than being re-enabled after
+        each one.  Unless 'collect' is false, a full collection is run
+        once before the first call.  The 'warmup'
+        run described in timeit() is only done once, before the first
+        run, and 'pin_cpu' and 'high_priority' apply to all the runs.
         """
-        r = []
-        for i in range(repeat):
-            t = self.timeit(number)
-            r.append(t)
+        timeit = self.timeit
+        state = _isolate(pin_cpu, high_priority)
+        gcold = gc.isenabled()
+        gc.disable()
+        try:
+            self._warmup(warmup)
+            if collect:
+                gc.collect()
+            r = [timeit(number) for i in range(repeat)]
+        finally:
+            if gcold:
+                gc.enable()
+            _restore(state)
         return r
 
+    def autorange(self, callback=None, warmup=0):
+        """Return the number of loops so that total time >= 0.2.
+
+        Calls the timeit method with number set to successive values
+        from the sequence 1, 2, 5, 10, 20, 50, ... until the time taken
+        is at least 0.2 second.  Returns (number, time_taken).
+
+        If callback is given and is not None, it will be called after
+        each trial with two arguments: callback(number, time_taken).
+        The 'warmup' run described in timeit() is done once, before the
+        first trial.
+        """
+        self._warmup(warmup)
+        i = 1
+        while True:
+            for j in 1, 2, 5:
+                number = i * j
+                time_taken = self.timeit(number)
+                if callback:
+                    callback(number, time_taken)
+                if time_taken >= 0.2:
+                    return (number, time_taken)
+            i *= 10
+
 def timeit(stmt="pass", setup="pass", timer=default_timer,
            number=default_number, globals=None):
     """Convenience function to create Timer object and call timeit method."""
@@ -238,10 +648,11 @@ def main(args=None, *, _wrap_timer=None):
         args = sys.argv[1:]
     import getopt
     try:
-        opts, args = getopt.getopt(args, "n:u:s:r:tcpvh",
+        opts, args = getopt.getopt(args, "n:u:s:r:tcpP:vh",
                                    ["number=", "setup=", "repeat=",
-                                    "time", "clock", "process",
-                                    "verbose", "unit=", "help"])
+                                    "time", "clock", "process", "pin=",
+                                    "auto-timer", "verbose", "unit=",
+                                    "help"])
     except getopt.error as err:
         print(err)
         print("use -h/--help for command line help")
@@ -255,6 +666,7 @@ def main(args=None, *, _wrap_timer=None):
     time_unit = None
     units = {"usec": 1, "msec": 1e3, "sec": 1e6}
     precision = 3
+    pin_cpu = None
     for o, a in opts:
         if o in ("-n", "--number"):
             number = int(a)
@@ -277,6 +689,10 @@ def main(args=None, *, _wrap_timer=None):
             timer = time.clock
         if o in ("-p", "--process"):
             timer = time.process_time
+        if o == "--auto-timer":
+            timer = _get_auto_timer()
+        if o in ("-P", "--pin"):
+            pin_cpu = int(a)
         if o in ("-v", "--verbose"):
             if verbose:
                 precision += 1
@@ -293,44 +709,43 @@ def main(args=None, *, _wrap_timer=None):
     if _wrap_timer is not None:
         timer = _wrap_timer(timer)
     t = Timer(stmt, setup, timer)
-    if number == 0:
-        # determine number so that 0.2 <= total time < 2.0
-        for i in range(1, 10):
-            number = 10**i
+    try:
+        state = _isolate(pin_cpu, False)
+    except (OSError, AttributeError) as err:
+        # AttributeError: no os.sched_setaffinity() on this platform
+        print("cannot pin to CPU %d: %s" % (pin_cpu, err), file=sys.stderr)
+        return 2
+    try:
+        if number == 0:
+            # determine number so that 0.2 <= total time < 0.5
+            callback = None
+            if verbose:
+                def callback(number, time_taken):
+                    print("%d loops -> %.*g secs" % (number, precision,
+                                                     time_taken))
             try:
-                x = t.timeit(number)
+                number, _ = t.autorange(callback)
             except:
                 t.print_exc()
                 return 1
-            if verbose:
-                print("%d loops -> %.*g secs" % (number, precision, x))
-            if x >= 0.2:
-                break
-    try:
-        r = t.repeat(repeat, number)
-    except:
-        t.print_exc()
-        return 1
+        try:
+            r = t.repeat(repeat, number)
+        except:
+            t.print_exc()
+            return 1
+    finally:
+        _restore(state)
     best = min(r)
     if verbose:
         print("raw times:", " ".join(["%.*g" % (precision, x) for x in r]))
     print("%d loops," % number, end=' ')
     usec = best * 1e6 / number
-    if time_unit is not None:
-        print("best of %d: %.*g %s per loop" % (repeat, precision,
-                                             usec/units[time_unit], time_unit))
-    else:
-        if usec < 1000:
-            print("best of %d: %.*g usec per loop" % (repeat, precision, usec))
-        else:
-            msec = usec / 1000
-            if msec < 1000:
-                print("best of %d: %.*g msec per loop" % (repeat,
-                                                          precision, msec))
-            else:
-                sec = msec / 1000
-                print("best of %d: %.*g sec per loop" % (repeat,
-                                                         precision, sec))
+    if time_unit is None:
+        time_unit = ("usec" if usec < 1e3 else
+                     "msec" if usec < 1e6 else
+                     "sec")
+    print("best of %d: %.*g %s per loop" % (repeat, precision,
+                                         usec/units[time_unit], time_unit))
     return None
 
 if __name__ == "__main__":